@@ -0,0 +1,221 @@
+#caller_history.py
+import argparse
+import datetime
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
+
+from config import DB_CONFIG, TABLE_NAME
+from data_cleaner import DataCleaner
+
+# imported_at vaut now() (début de transaction) : un import peut être validé
+# après un import plus récent. On relit donc cette fenêtre à chaque synchro.
+SYNC_WINDOW = datetime.timedelta(hours=1)
+
+
+class CallerHistoryCache:
+    """
+    Cache LRU en mémoire des historiques d'appelants.
+
+    Chaque entrée retient le premier jour dont elle dépend : un import qui
+    touche ce jour ou un jour postérieur peut modifier le résultat, l'entrée
+    est alors invalidée. Les entrées expirent aussi après ttl secondes.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.last_import = None  # dernier imported_at vu dans imported_files
+        self.seen_imports = {}  # id -> imported_at des imports déjà traités dans la fenêtre
+        self._entries = OrderedDict()  # (numero, limit) -> (premier_jour, expiration, resultat)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, key, since_day, result):
+        self._entries[key] = (since_day, time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate_day(self, day):
+        """Supprime les entrées qui dépendent du jour importé"""
+        stale = [k for k, (since_day, _, _) in self._entries.items() if since_day <= day]
+        for k in stale:
+            del self._entries[k]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache partagé par le processus (scheduler, API...), invalidé par main.process_csv
+# et, pour les imports faits par d’autres processus, via imported_files (CallerHistory._sync)
+CACHE = CallerHistoryCache()
+
+
+def invalidate_days(days):
+    """Invalide le cache pour chaque jour touché par un import"""
+    for day in days:
+        CACHE.invalidate_day(day)
+
+
+class CallerHistory:
+    """
+    Lecture seule : l’index (numero_telephone_clean, datetime_appel) est
+    déclaré dans les scripts de db/ (voir db/create-table_incoming.sql).
+    """
+
+    def __init__(self, db_config: dict, table_name: str, cache: CallerHistoryCache = CACHE):
+        self.table_name = table_name
+        self.cache = cache
+        self.engine = create_engine(
+            f"postgresql+psycopg2://{db_config['user']}:{db_config['password']}"
+            f"@{db_config['host']}:{db_config['port']}/{db_config['dbname']}"
+        )
+
+    def _sync(self, conn):
+        """
+        Invalide le cache pour les imports consignés dans imported_files depuis
+        la dernière vérification, y compris ceux d’autres processus.
+        """
+        cache = self.cache
+        try:
+            if cache.last_import is None:
+                # Premier passage : rien ne garantit la fraîcheur du cache
+                cache.clear()
+                cache.last_import = conn.execute(
+                    text("SELECT max(imported_at) FROM imported_files")
+                ).scalar() or datetime.datetime.min
+            since = self._window_start()
+            rows = conn.execute(
+                text("""
+                    SELECT id, imported_at, max_datetime_appel FROM imported_files
+                    WHERE imported_at > :since AND status = 'imported'
+                """),
+                {"since": since}
+            ).fetchall()
+        except ProgrammingError:
+            # imported_files n’existe pas encore : aucun import
+            conn.rollback()
+            return
+
+        for import_id, imported_at, max_dt in rows:
+            if import_id in cache.seen_imports:
+                continue
+            cache.seen_imports[import_id] = imported_at
+            if max_dt is None:
+                cache.clear()
+            else:
+                cache.invalidate_day(max_dt.date())
+            cache.last_import = max(cache.last_import, imported_at)
+
+        since = self._window_start()
+        cache.seen_imports = {i: t for i, t in cache.seen_imports.items() if t > since}
+
+    def _window_start(self):
+        last = self.cache.last_import
+        if last - datetime.datetime.min <= SYNC_WINDOW:
+            return datetime.datetime.min
+        return last - SYNC_WINDOW
+
+    def lookup(self, phone, limit: int = 10) -> dict:
+        """
+        Retourne les derniers appels d’un numéro et le nombre de réitérations
+        (appels précédant le dernier, comme les reit_* de v_incoming_reiteration)
+        sur l’heure, le jour et la semaine ISO du dernier appel.
+        """
+        numero = DataCleaner.normalize_phone(phone)
+        if numero is None:
+            return {"numero": None, "calls": [], "repeats": {"heure": 0, "jour": 0, "semaine": 0}}
+
+        with self.engine.connect() as conn:
+            self._sync(conn)
+            key = (numero, limit)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+            calls = [dict(row) for row in conn.execute(
+                text(f"""
+                    SELECT datetime_appel, date_appel, heure_appel, duree_appel,
+                           nom_agent, nom_campagne, nom_qualification, nom_qualification_detaillee
+                    FROM {self.table_name}
+                    WHERE numero_telephone_clean = :n
+                      AND datetime_appel IS NOT NULL
+                    ORDER BY datetime_appel DESC
+                    LIMIT :limit
+                """),
+                {"n": numero, "limit": limit}
+            ).mappings()]
+
+            repeats = {"heure": 0, "jour": 0, "semaine": 0}
+            if calls:
+                last = calls[0]["datetime_appel"]
+                row = conn.execute(
+                    text(f"""
+                        SELECT
+                            GREATEST(COUNT(*) FILTER (WHERE datetime_appel >= date_trunc('hour', CAST(:last AS TIMESTAMP))) - 1, 0) AS heure,
+                            GREATEST(COUNT(*) FILTER (WHERE datetime_appel >= date_trunc('day', CAST(:last AS TIMESTAMP))) - 1, 0) AS jour,
+                            GREATEST(COUNT(*) - 1, 0) AS semaine
+                        FROM {self.table_name}
+                        WHERE numero_telephone_clean = :n
+                          AND datetime_appel >= date_trunc('week', CAST(:last AS TIMESTAMP))
+                          AND datetime_appel <= :last
+                    """),
+                    {"n": numero, "last": last}
+                ).mappings().one()
+                repeats = dict(row)
+
+        result = {"numero": numero, "calls": calls, "repeats": repeats}
+        self.cache.put(key, self._since_day(calls, limit), result)
+        return result
+
+    @staticmethod
+    def _since_day(calls, limit):
+        """Premier jour dont dépend le résultat (voir CallerHistoryCache)"""
+        days = [c["datetime_appel"].date() for c in calls]
+        if len(days) < limit:
+            # Historique incomplet : n’importe quel jour importé peut l’enrichir
+            return datetime.date.min
+        last = max(days)
+        week_start = last - datetime.timedelta(days=last.isoweekday() - 1)
+        return min(min(days), week_start)
+
+    def close(self):
+        self.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Historique des appels d’un numéro")
+    parser.add_argument("numero", help="Numéro de téléphone (format libre)")
+    parser.add_argument("-n", "--limit", type=int, default=10, help="Nombre d’appels à afficher")
+    args = parser.parse_args()
+
+    history = CallerHistory(DB_CONFIG, TABLE_NAME)
+    result = history.lookup(args.numero, limit=args.limit)
+    history.close()
+
+    if result["numero"] is None:
+        print("Numéro invalide.")
+    else:
+        print(f"Numéro : {result['numero']}")
+        for call in result["calls"]:
+            print(
+                f"  {call['datetime_appel']}  {call['duree_appel'] or 0:>5}s  "
+                f"{call['nom_campagne'] or ''}  {call['nom_qualification'] or ''}"
+                f"/{call['nom_qualification_detaillee'] or ''}  {call['nom_agent'] or ''}"
+            )
+        r = result["repeats"]
+        print(f"Réitérations : heure={r['heure']} jour={r['jour']} semaine={r['semaine']}")
@@ -15,3 +15,9 @@ DB_CONFIG = {
 TABLE_NAME = os.getenv("TABLE_NAME", "call_logs")
 
 VIEW_NAME = os.environ.get("VIEW_NAME", "v_incoming_reiteration")
+
+# "wide" : textes stockés dans TABLE_NAME ; "dimension" : clés entières dans
+# FACT_TABLE_NAME, TABLE_NAME devient une vue (db/create-table_dimensions.sql)
+STORAGE_MODE = os.getenv("STORAGE_MODE", "wide")
+
+FACT_TABLE_NAME = os.getenv("FACT_TABLE_NAME", "call_logs_fact")
@@ -0,0 +1,93 @@
+-- Mode de stockage "dimension" (STORAGE_MODE=dimension dans le .env)
+-- Les textes répétés (agent, campagne, qualification) sont stockés une seule fois
+-- dans des tables de dimension ; la table de faits ne garde que des clés entières.
+-- La vue call_logs garde les noms de colonnes actuels (scheduler, export, vues...).
+-- Les données d'une table call_logs existante sont à migrer avant de la remplacer par la vue.
+-- Noms attendus dans le .env : TABLE_NAME=call_logs (vue), FACT_TABLE_NAME=call_logs_fact
+-- (les renommer ici et dans db/v_incoming_dimension.sql si le .env diffère).
+-- v_incoming_reiteration : utiliser db/v_incoming_dimension.sql au lieu de db/v_incoming.sql.
+
+CREATE TABLE IF NOT EXISTS dim_agent (
+    agent_id SERIAL PRIMARY KEY,
+    nom_agent TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_agent
+    ON dim_agent ((COALESCE(nom_agent, '')));
+
+CREATE TABLE IF NOT EXISTS dim_campagne (
+    campagne_id SERIAL PRIMARY KEY,
+    nom_campagne TEXT,
+    sous_campagne TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_campagne
+    ON dim_campagne ((COALESCE(nom_campagne, '')), (COALESCE(sous_campagne, '')));
+
+CREATE TABLE IF NOT EXISTS dim_qualification (
+    qualification_id SERIAL PRIMARY KEY,
+    nom_qualification TEXT,
+    nom_qualification_detaillee TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_qualification
+    ON dim_qualification ((COALESCE(nom_qualification, '')), (COALESCE(nom_qualification_detaillee, '')));
+
+CREATE TABLE call_logs_fact (
+    incoming_id UUID DEFAULT uuid_generate_v4(),
+    semaine INT,
+    datetime_appel TIMESTAMP,
+    date_appel DATE,
+    heure_appel TEXT,
+    indice BIGINT,
+    duree_prise_en_charge INT,
+    duree_post_travail_agent INT,
+    duree_appel INT,
+    numero_telephone TEXT,
+    numero_telephone_clean TEXT,
+    id_agent_1 INT,
+    id_agent_2 INT,
+    qualification_id INT REFERENCES dim_qualification (qualification_id),
+    agent_id INT REFERENCES dim_agent (agent_id),
+    campagne_id INT REFERENCES dim_campagne (campagne_id),
+    numero_court INT,
+    raccrochage INT,
+    commentaire TEXT
+);
+
+-- historique par appelant (caller_history.py)
+CREATE INDEX IF NOT EXISTS idx_call_logs_fact_numero_clean_datetime
+    ON call_logs_fact (numero_telephone_clean, datetime_appel DESC);
+
+-- Vue de compatibilité : mêmes colonnes que l'ancienne table call_logs,
+-- plus les clés entières
+DROP VIEW IF EXISTS call_logs;
+
+CREATE VIEW call_logs AS
+SELECT
+    f.incoming_id,
+    f.semaine,
+    f.datetime_appel,
+    f.date_appel,
+    f.heure_appel,
+    f.indice,
+    f.duree_prise_en_charge,
+    f.duree_post_travail_agent,
+    f.duree_appel,
+    f.numero_telephone,
+    f.numero_telephone_clean,
+    f.id_agent_1,
+    f.id_agent_2,
+    q.nom_qualification,
+    q.nom_qualification_detaillee,
+    a.nom_agent,
+    c.nom_campagne,
+    c.sous_campagne,
+    f.numero_court,
+    f.raccrochage,
+    f.commentaire,
+    f.qualification_id,
+    f.agent_id,
+    f.campagne_id
+FROM
+    call_logs_fact f
+    LEFT JOIN dim_qualification q ON q.qualification_id = f.qualification_id
+    LEFT JOIN dim_agent a ON a.agent_id = f.agent_id
+    LEFT JOIN dim_campagne c ON c.campagne_id = f.campagne_id;
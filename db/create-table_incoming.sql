@@ -22,6 +22,13 @@ CREATE TABLE call_logs (
     commentaire TEXT
 );
 
+-- historique par appelant (caller_history.py)
+-- sur une base existante, sans bloquer les imports :
+-- CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_call_logs_numero_clean_datetime
+--     ON call_logs (numero_telephone_clean, datetime_appel DESC);
+CREATE INDEX IF NOT EXISTS idx_call_logs_numero_clean_datetime
+    ON call_logs (numero_telephone_clean, datetime_appel DESC);
+
 
 -- if error creating uuid 
 -- use this before by activating uuid-ossp extension
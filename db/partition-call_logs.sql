@@ -0,0 +1,39 @@
+-- Variante partitionnée de call_logs : une partition par date_appel.
+-- main.py crée la partition du jour à l'import (call_logs_YYYYMMDD) et,
+-- avec --replace-day, échange la partition d'une journée corrigée en une
+-- seule opération de métadonnées (DETACH / ATTACH / DROP).
+-- Sans partitionnement, --replace-day est refusé (pas de DELETE massif).
+-- Pour une table existante : la renommer, créer celle-ci, puis
+-- INSERT INTO call_logs SELECT * FROM call_logs_old (les partitions doivent exister).
+
+CREATE TABLE call_logs (
+    incoming_id UUID DEFAULT uuid_generate_v4(),
+    semaine INT,
+    datetime_appel TIMESTAMP,
+    date_appel DATE NOT NULL,
+    heure_appel TEXT,
+    indice BIGINT,
+    duree_prise_en_charge INT,
+    duree_post_travail_agent INT,
+    duree_appel INT,
+    numero_telephone TEXT,
+    numero_telephone_clean TEXT,
+    id_agent_1 INT,
+    id_agent_2 INT,
+    nom_qualification TEXT,
+    nom_qualification_detaillee TEXT,
+    nom_agent TEXT,
+    nom_campagne TEXT,
+    sous_campagne TEXT,
+    numero_court INT,
+    raccrochage INT,
+    commentaire TEXT
+) PARTITION BY RANGE (date_appel);
+
+-- historique par appelant (caller_history.py)
+CREATE INDEX IF NOT EXISTS idx_call_logs_numero_clean_datetime
+    ON call_logs (numero_telephone_clean, datetime_appel DESC);
+
+-- Exemple de partition journalière (créée automatiquement par main.py)
+-- CREATE TABLE call_logs_20250915 PARTITION OF call_logs
+--     FOR VALUES FROM ('2025-09-15') TO ('2025-09-16');
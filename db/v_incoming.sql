@@ -1,3 +1,4 @@
+-- STORAGE_MODE=dimension : utiliser db/v_incoming_dimension.sql
 DROP VIEW IF EXISTS v_incoming_reiteration;
 
 CREATE VIEW v_incoming_reiteration AS
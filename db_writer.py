@@ -1,12 +1,23 @@
 # db_writer.py
 from sqlalchemy import create_engine, text
 from io import StringIO
+import datetime
 import pandas as pd
 
+from config import FACT_TABLE_NAME
+from dimension_cache import DimensionCache
+
 class DBWriter:
-    def __init__(self, db_config: dict, table_name: str, view_name: str ):
+    def __init__(self, db_config: dict, table_name: str, view_name: str,
+                 storage_mode: str = "wide", fact_table_name: str = FACT_TABLE_NAME):
         self.db_config = db_config
         self.table_name = table_name
+        # En mode "dimension", les lignes vont dans la table de faits (clés entières)
+        self.storage_mode = storage_mode
+        self.fact_table_name = fact_table_name
+        self.dimensions = DimensionCache() if storage_mode == "dimension" else None
+        self.target_table = self.fact_table_name if self.dimensions is not None else table_name
+        self._partitioned = None
         self.engine = create_engine(
             f"postgresql+psycopg2://{db_config['user']}:{db_config['password']}"
             f"@{db_config['host']}:{db_config['port']}/{db_config['dbname']}"
@@ -15,51 +26,248 @@ class DBWriter:
         self.view_name = view_name
 
     def _ensure_log_table(self):
-        """Crée la table de log si elle n’existe pas"""
+        """
+        Crée ou met à jour la table de log. La migration (DDL, verrou exclusif)
+        ne s’exécute que si le catalogue montre qu’elle manque.
+        """
         with self.engine.connect() as conn:
+            columns = set(conn.execute(text("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'imported_files'
+            """)).scalars())
+            if "status" in columns:
+                return
+
             conn.execute(text("""
                 CREATE TABLE IF NOT EXISTS imported_files (
                     id SERIAL PRIMARY KEY,
-                    file_name TEXT UNIQUE,
+                    file_name TEXT,
                     imported_at TIMESTAMP DEFAULT now()
                 )
             """))
+            # Une ligne par import : l’historique des empreintes d’un même nom est conservé
+            conn.execute(text("ALTER TABLE imported_files DROP CONSTRAINT IF EXISTS imported_files_file_name_key"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_imported_files_file_name ON imported_files (file_name)"))
+            # Empreinte du contenu, résumé des données importées et statut
+            # ('imported', ou 'flagged' : contenu modifié sous un nom connu, non importé)
+            conn.execute(text("""
+                ALTER TABLE imported_files
+                    ADD COLUMN IF NOT EXISTS file_size BIGINT,
+                    ADD COLUMN IF NOT EXISTS sample_hash TEXT,
+                    ADD COLUMN IF NOT EXISTS full_hash TEXT,
+                    ADD COLUMN IF NOT EXISTS row_count BIGINT,
+                    ADD COLUMN IF NOT EXISTS min_datetime_appel TIMESTAMP,
+                    ADD COLUMN IF NOT EXISTS max_datetime_appel TIMESTAMP,
+                    ADD COLUMN IF NOT EXISTS content_changed BOOLEAN DEFAULT false,
+                    ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'imported'
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_imported_files_fingerprint
+                ON imported_files (file_size, sample_hash)
+            """))
             conn.commit()
 
     def already_imported(self, file_name: str) -> bool:
         """Vérifie si le fichier a déjà été importé"""
+        return self.get_import(file_name) is not None
+
+    def get_import(self, file_name: str):
+        """Retourne le dernier import d’un fichier (ou None)"""
         with self.engine.connect() as conn:
-            result = conn.execute(
-                text("SELECT 1 FROM imported_files WHERE file_name = :f"),
+            return conn.execute(
+                text("""
+                    SELECT * FROM imported_files WHERE file_name = :f AND status = 'imported'
+                    ORDER BY imported_at DESC, id DESC LIMIT 1
+                """),
                 {"f": file_name}
-            ).fetchone()
-            return result is not None
+            ).mappings().fetchone()
 
-    def log_import(self, file_name: str):
-        """Consigne qu’un fichier a été importé"""
+    def find_candidates(self, fingerprint: dict) -> list:
+        """
+        Imports dont la taille et le hash échantillonné correspondent (quel que
+        soit le nom). Ce ne sont que des candidats : le contenu n’est identique
+        que si le hash complet l’est aussi.
+        """
         with self.engine.connect() as conn:
-            conn.execute(
-                text("INSERT INTO imported_files (file_name) VALUES (:f) ON CONFLICT DO NOTHING"),
-                {"f": file_name}
-            )
+            return conn.execute(
+                text("""
+                    SELECT file_name, full_hash FROM imported_files
+                    WHERE file_size = :file_size
+                      AND sample_hash = :sample_hash
+                      AND full_hash IS NOT NULL
+                      AND status = 'imported'
+                """),
+                fingerprint
+            ).mappings().fetchall()
+
+    def log_import(self, file_name: str, fingerprint: dict = None, stats: dict = None,
+                   content_changed: bool = False, status: str = "imported"):
+        """Consigne qu’un fichier a été importé, ou signalé (avec son empreinte et ses stats)"""
+        with self.engine.connect() as conn:
+            self._log_import(conn, file_name, fingerprint, stats, content_changed, status)
             conn.commit()
 
-    def copy_dataframe(self, df: pd.DataFrame):
-        """Insère un DataFrame en bulk via COPY"""
+    @staticmethod
+    def _log_import(conn, file_name, fingerprint=None, stats=None, content_changed=False,
+                    status="imported"):
+        params = {
+            "f": file_name,
+            "status": status,
+            "file_size": None, "sample_hash": None, "full_hash": None,
+            "row_count": None, "min_datetime_appel": None, "max_datetime_appel": None,
+            "content_changed": content_changed,
+        }
+        params.update(fingerprint or {})
+        params.update(stats or {})
+        conn.execute(
+            text("""
+                INSERT INTO imported_files (
+                    file_name, file_size, sample_hash, full_hash,
+                    row_count, min_datetime_appel, max_datetime_appel, content_changed, status
+                )
+                VALUES (
+                    :f, :file_size, :sample_hash, :full_hash,
+                    :row_count, :min_datetime_appel, :max_datetime_appel, :content_changed, :status
+                )
+            """),
+            params
+        )
+
+    def copy_dataframe(self, df: pd.DataFrame, table_name: str = None):
+        """Insère un DataFrame en bulk via COPY (table cible ou table de staging)"""
         conn = self.engine.raw_connection()
         cur = conn.cursor()
+        target = table_name or self.target_table
+
+        try:
+            if self.dimensions is not None:
+                df = self.dimensions.resolve(df, cur)
+
+            buffer = StringIO()
+            df.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+
+            cols = ",".join(df.columns)
+            sql = f"COPY {target} ({cols}) FROM STDIN WITH CSV"
+            cur.copy_expert(sql, buffer)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            if self.dimensions is not None:
+                # Les clés insérées dans cette transaction n’existent plus
+                self.dimensions.clear()
+            raise
+        finally:
+            cur.close()
+            conn.close()
 
-        buffer = StringIO()
-        df.to_csv(buffer, index=False, header=False)
-        buffer.seek(0)
+    def is_partitioned(self) -> bool:
+        """La table cible est-elle partitionnée par date_appel (db/partition-call_logs.sql) ?"""
+        if self._partitioned is None:
+            with self.engine.connect() as conn:
+                self._partitioned = conn.execute(
+                    text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"),
+                    {"t": self.target_table}
+                ).scalar()
+        return self._partitioned
 
-        cols = ",".join(df.columns)
-        sql = f"COPY {self.table_name} ({cols}) FROM STDIN WITH CSV"
-        cur.copy_expert(sql, buffer)
+    def day_partition_name(self, day: datetime.date) -> str:
+        return f"{self.target_table}_{day:%Y%m%d}"
 
-        conn.commit()
-        cur.close()
-        conn.close()
+    def ensure_day_partition(self, day: datetime.date):
+        """Crée la partition du jour si la table cible est partitionnée"""
+        if not self.is_partitioned():
+            return
+        next_day = day + datetime.timedelta(days=1)
+        with self.engine.connect() as conn:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {self.day_partition_name(day)}
+                PARTITION OF {self.target_table}
+                FOR VALUES FROM ('{day.isoformat()}') TO ('{next_day.isoformat()}')
+            """))
+            conn.commit()
+
+    def create_staging_table(self, day: datetime.date) -> str:
+        """
+        Crée une table vide de même structure que la table cible (sans index,
+        pour un COPY à pleine vitesse) pour y charger une journée corrigée.
+        La contrainte CHECK garantit que le fichier ne contient que ce jour et
+        permet un ATTACH PARTITION sans scan.
+        """
+        staging = f"{self.day_partition_name(day)}_new"
+        next_day = day + datetime.timedelta(days=1)
+        with self.engine.connect() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+            conn.execute(text(f"""
+                CREATE TABLE {staging} (LIKE {self.target_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            """))
+            conn.execute(text(f"""
+                ALTER TABLE {staging} ADD CONSTRAINT {staging}_day CHECK (
+                    date_appel IS NOT NULL
+                    AND date_appel >= DATE '{day.isoformat()}'
+                    AND date_appel < DATE '{next_day.isoformat()}'
+                )
+            """))
+            conn.commit()
+        return staging
+
+    def index_staging_table(self, staging: str):
+        """
+        Crée sur la table de staging chargée les index de la table cible :
+        l’ATTACH PARTITION les reprend au lieu de les construire sous verrou.
+        """
+        with self.engine.connect() as conn:
+            indexes = conn.execute(
+                text("""
+                    SELECT indisunique, pg_get_indexdef(indexrelid) AS definition
+                    FROM pg_index WHERE indrelid = to_regclass(:t)
+                """),
+                {"t": self.target_table}
+            ).fetchall()
+            for unique, definition in indexes:
+                # "CREATE INDEX nom ON ONLY table USING btree (...)" -> même définition sur le staging
+                using = definition[definition.index(" USING "):]
+                conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX ON {staging}{using}"))
+            conn.commit()
+
+    def drop_table(self, table_name: str):
+        with self.engine.connect() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            conn.commit()
+
+    def replace_day(self, day: datetime.date, staging: str, file_name: str,
+                    fingerprint: dict = None, stats: dict = None, content_changed: bool = False):
+        """
+        Remplace atomiquement la partition d’un jour par la table de staging
+        (DETACH / ATTACH / DROP, opérations de métadonnées) et met à jour
+        imported_files dans la même transaction.
+        """
+        if not self.is_partitioned():
+            raise RuntimeError(
+                f"{self.target_table} n’est pas partitionnée par date_appel : --replace-day "
+                f"nécessite le schéma de db/partition-call_logs.sql"
+            )
+        # Hors transaction d’échange : la construction des index ne verrouille que le staging
+        self.index_staging_table(staging)
+
+        partition = self.day_partition_name(day)
+        next_day = day + datetime.timedelta(days=1)
+        with self.engine.begin() as conn:
+            old_exists = conn.execute(
+                text("SELECT to_regclass(:p) IS NOT NULL"), {"p": partition}
+            ).scalar()
+            if old_exists:
+                conn.execute(text(f"ALTER TABLE {self.target_table} DETACH PARTITION {partition}"))
+                conn.execute(text(f"ALTER TABLE {partition} RENAME TO {partition}_old"))
+            conn.execute(text(f"ALTER TABLE {staging} RENAME TO {partition}"))
+            conn.execute(text(f"""
+                ALTER TABLE {self.target_table} ATTACH PARTITION {partition}
+                FOR VALUES FROM ('{day.isoformat()}') TO ('{next_day.isoformat()}')
+            """))
+            if old_exists:
+                conn.execute(text(f"DROP TABLE {partition}_old"))
+            self._log_import(conn, file_name, fingerprint, stats, content_changed)
 
     def close(self):
         self.engine.dispose()
@@ -0,0 +1,70 @@
+#dimension_cache.py
+import pandas as pd
+
+# table de dimension -> (clé entière, colonnes texte remplacées dans la table de faits)
+DIMENSIONS = {
+    "dim_agent": ("agent_id", ["nom_agent"]),
+    "dim_campagne": ("campagne_id", ["nom_campagne", "sous_campagne"]),
+    "dim_qualification": ("qualification_id", ["nom_qualification", "nom_qualification_detaillee"]),
+}
+
+
+class DimensionCache:
+    """
+    Résout les libellés (agent, campagne, qualification) en clés entières.
+    Les valeurs déjà vues sont servies depuis la mémoire ; les nouvelles sont
+    insérées en une seule requête par dimension et par chunk.
+    """
+
+    def __init__(self, dimensions=DIMENSIONS):
+        self.dimensions = dimensions
+        self._ids = {table: {} for table in dimensions}  # table -> {tuple libellés: id}
+
+    def resolve(self, df: pd.DataFrame, cur) -> pd.DataFrame:
+        """Remplace les colonnes texte par leurs clés (cur : curseur psycopg2)"""
+        df = df.copy()
+        for table, (key_col, cols) in self.dimensions.items():
+            present = [c for c in cols if c in df.columns]
+            if not present:
+                continue
+            values = df.reindex(columns=cols).astype(object)
+            values = values.where(values.notna(), None)
+            keys = list(values.itertuples(index=False, name=None))
+
+            cache = self._ids[table]
+            missing = {k for k in keys if k not in cache and any(v is not None for v in k)}
+            if missing:
+                self._load(cur, table, key_col, cols, sorted(missing, key=str))
+                unresolved = [k for k in missing if k not in cache]
+                if unresolved:
+                    raise RuntimeError(f"{table} : libellés non résolus {unresolved[:5]}")
+
+            df[key_col] = pd.array([cache.get(k) for k in keys], dtype="Int64")
+            df = df.drop(columns=present)
+        return df
+
+    def _load(self, cur, table, key_col, cols, keys):
+        """Insère les libellés inconnus puis récupère leurs clés"""
+        arrays = [list(col) for col in zip(*keys)]
+        unnest = "unnest(" + ", ".join(["%s::text[]"] * len(cols)) + ")"
+        conflict = ", ".join(f"(COALESCE({c}, ''))" for c in cols)
+        match = " AND ".join(f"COALESCE(d.{c}, '') = COALESCE(u.{c}, '')" for c in cols)
+
+        cur.execute(
+            f"INSERT INTO {table} ({', '.join(cols)}) SELECT * FROM {unnest} "
+            f"ON CONFLICT ({conflict}) DO NOTHING",
+            arrays
+        )
+        cur.execute(
+            f"SELECT d.{key_col}, {', '.join(f'u.{c}' for c in cols)} "
+            f"FROM {table} d JOIN {unnest} AS u({', '.join(cols)}) ON {match}",
+            arrays
+        )
+        # Clé de cache = valeurs demandées (u.*), pas celles stockées (NULL et '' confondus)
+        cache = self._ids[table]
+        for row in cur.fetchall():
+            cache[tuple(row[1:])] = row[0]
+
+    def clear(self):
+        for cache in self._ids.values():
+            cache.clear()
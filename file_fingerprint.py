@@ -0,0 +1,51 @@
+#file_fingerprint.py
+import hashlib
+import os
+
+BLOCK_SIZE = 64 * 1024  # taille d’un bloc échantillonné
+SAMPLE_BLOCKS = 16      # nombre de blocs répartis sur le fichier
+
+
+def sample_hash(path, size=None, block_size=BLOCK_SIZE, blocks=SAMPLE_BLOCKS):
+    """
+    Hash rapide : taille + blocs répartis uniformément (début, milieu, fin).
+    Les petits fichiers sont lus en entier.
+    """
+    size = os.path.getsize(path) if size is None else size
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+
+    with open(path, "rb") as f:
+        if size <= block_size * blocks:
+            h.update(f.read())
+        else:
+            step = (size - block_size) // (blocks - 1)
+            for i in range(blocks):
+                f.seek(i * step)
+                h.update(f.read(block_size))
+    return h.hexdigest()
+
+
+def full_hash(path, block_size=1024 * 1024):
+    """Hash complet du fichier, lu en streaming"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_fingerprint(path) -> dict:
+    """
+    Empreinte rapide du contenu : taille et hash échantillonné.
+    Elle ne sert qu’à trouver des candidats ; le hash complet (full_hash) reste
+    nécessaire pour confirmer un doublon et est consigné à chaque import. Il
+    coûte une lecture séquentielle du fichier, bien moins qu’un parsing pandas,
+    mais un doublon de gros fichier n’est donc pas rejeté en millisecondes.
+    """
+    size = os.path.getsize(path)
+    return {
+        "file_size": size,
+        "sample_hash": sample_hash(path, size),
+        "full_hash": None,
+    }
@@ -2,40 +2,140 @@ import argparse
 import logging
 import os
 
-from config import DB_CONFIG, TABLE_NAME
+from caller_history import invalidate_days
+from config import DB_CONFIG, TABLE_NAME, VIEW_NAME, STORAGE_MODE, FACT_TABLE_NAME
 from csv_reader import CSVReader
 from data_cleaner import DataCleaner
 from db_writer import DBWriter
+from file_fingerprint import file_fingerprint, full_hash
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
-def process_csv(path, include_comment=False):
+def _update_stats(stats, df):
+    """Cumule le nombre de lignes et l’intervalle de datetime_appel"""
+    stats["row_count"] += len(df)
+    if "datetime_appel" not in df.columns:
+        return
+    dt = df["datetime_appel"].dropna()
+    if dt.empty:
+        return
+    lo, hi = dt.min().to_pydatetime(), dt.max().to_pydatetime()
+    if stats["min_datetime_appel"] is None or lo < stats["min_datetime_appel"]:
+        stats["min_datetime_appel"] = lo
+    if stats["max_datetime_appel"] is None or hi > stats["max_datetime_appel"]:
+        stats["max_datetime_appel"] = hi
+
+def process_csv(path, include_comment=False, replace_day=False):
+    """
+    Importe un fichier CSV. Avec replace_day, le fichier (une seule journée)
+    est chargé dans une table de staging puis remplace atomiquement ce jour.
+    """
     file_name = os.path.basename(path)  # juste le nom du fichier
-    writer = DBWriter(DB_CONFIG, TABLE_NAME)
+    writer = DBWriter(DB_CONFIG, TABLE_NAME, VIEW_NAME, STORAGE_MODE, FACT_TABLE_NAME)
 
-    # Vérif si déjà importé
-    if writer.already_imported(file_name):
-        logging.warning(f"⚠️ Le fichier {file_name} a déjà été importé, skip.")
+    # Vérif si déjà importé : même contenu (même renommé), avant toute lecture pandas.
+    # Le hash échantillonné ne fait que désigner des candidats, confirmés par le hash complet.
+    fingerprint = file_fingerprint(path)
+    candidates = writer.find_candidates(fingerprint)
+    if candidates:
+        fingerprint["full_hash"] = full_hash(path)
+        duplicate_of = next(
+            (c["file_name"] for c in candidates if c["full_hash"] == fingerprint["full_hash"]), None
+        )
+        if duplicate_of is not None:
+            logging.warning(f"⚠️ Le fichier {file_name} a le même contenu que {duplicate_of}, déjà importé, skip.")
+            writer.close()
+            return
+
+    # Le remplacement d’une journée n’existe que par échange de partitions
+    if replace_day and not writer.is_partitioned():
+        logging.error(
+            f"❌ {writer.target_table} n’est pas partitionnée par date_appel : --replace-day "
+            f"nécessite le schéma de db/partition-call_logs.sql. Import annulé."
+        )
         writer.close()
         return
 
+    # Le hash complet est toujours consigné pour les comparaisons futures
+    if fingerprint["full_hash"] is None:
+        fingerprint["full_hash"] = full_hash(path)
+
+    # Même nom mais contenu différent : signalé dans imported_files (status 'flagged').
+    # Seul --replace-day peut le remplacer, un import normal ajouterait ses lignes
+    # à celles de l’ancienne version.
+    content_changed = False
+    previous = writer.get_import(file_name)
+    if previous is not None:
+        if not replace_day:
+            writer.log_import(file_name, fingerprint, content_changed=True, status="flagged")
+            logging.warning(
+                f"⚠️ Le fichier {file_name} a déjà été importé avec un contenu différent "
+                f"({previous['row_count']} lignes) : signalé, non importé. "
+                f"Utiliser --replace-day pour le remplacer."
+            )
+            writer.close()
+            return
+        content_changed = True
+        logging.info(f"Fichier corrigé {file_name} : remplacement de la journée.")
+
     reader = CSVReader(path, chunksize=50000, include_comment=include_comment)
+    days = set()  # jours touchés, pour invalider le cache d’historique
+    stats = {"row_count": 0, "min_datetime_appel": None, "max_datetime_appel": None}
+    staging = None
 
-    for i, chunk in enumerate(reader.get_chunks()):
-        logging.info(f"Chunk {i} : {len(chunk)} lignes lues")
-        clean_df = DataCleaner.clean(chunk)
-        writer.copy_dataframe(clean_df)
-        logging.info(f"Chunk {i} inséré dans PostgreSQL")
+    try:
+        for i, chunk in enumerate(reader.get_chunks()):
+            logging.info(f"Chunk {i} : {len(chunk)} lignes lues")
+            clean_df = DataCleaner.clean(chunk)
+            chunk_days = set(clean_df["date_appel"].dropna().dt.date.unique()) if "date_appel" in clean_df.columns else set()
+
+            if replace_day or writer.is_partitioned():
+                # Les lignes sans date ne peuvent être rattachées à aucune journée
+                dropped = clean_df["date_appel"].isna().sum()
+                if dropped:
+                    logging.warning(f"Chunk {i} : {dropped} lignes sans date_appel ignorées")
+                    clean_df = clean_df[clean_df["date_appel"].notna()]
+
+            if replace_day:
+                if len(days | chunk_days) > 1:
+                    raise ValueError(f"--replace-day attend une seule journée, trouvé : {sorted(days | chunk_days)}")
+                if staging is None and chunk_days:
+                    staging = writer.create_staging_table(next(iter(chunk_days)))
+                if staging is not None:
+                    writer.copy_dataframe(clean_df, staging)
+            else:
+                for day in chunk_days - days:
+                    writer.ensure_day_partition(day)
+                writer.copy_dataframe(clean_df)
+
+            days.update(chunk_days)
+            _update_stats(stats, clean_df)
+            logging.info(f"Chunk {i} inséré dans PostgreSQL")
+
+        # On log l’import réussi (dans la transaction d’échange en mode replace_day)
+        if replace_day:
+            if staging is None:
+                raise ValueError(f"Aucune ligne datée dans {file_name}, rien à remplacer")
+            day = next(iter(days))
+            writer.replace_day(day, staging, file_name, fingerprint, stats, content_changed=content_changed)
+            staging = None
+            logging.info(f"Journée du {day} remplacée")
+        else:
+            writer.log_import(file_name, fingerprint, stats, content_changed=content_changed)
+    finally:
+        if staging is not None:
+            writer.drop_table(staging)
+        writer.close()
 
-    # On log l’import réussi
-    writer.log_import(file_name)
-    writer.close()
+    invalidate_days(days)
     logging.info(f"✅ Import terminé avec succès pour {file_name} !")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingestion CSV -> PostgreSQL")
     parser.add_argument("csv_path", help="Chemin du fichier CSV")
     parser.add_argument("--include_comment", action="store_true", help="Inclure la colonne COMMENTAIRE")
+    parser.add_argument("--replace-day", "--replace_day", dest="replace_day", action="store_true",
+                        help="Remplacer atomiquement la journée contenue dans le fichier (export corrigé)")
     args = parser.parse_args()
 
-    process_csv(args.csv_path, include_comment=args.include_comment)
+    process_csv(args.csv_path, include_comment=args.include_comment, replace_day=args.replace_day)